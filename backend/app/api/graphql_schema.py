@@ -7,7 +7,7 @@ from typing import List
 import logging
 
 from ..core.models import SentimentResult as SentimentResultModel, ModelInfo as ModelInfoModel
-from ..services.inference import inference_service
+from ..services.inference import get_inference_service
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +29,7 @@ class Query:
     def predict(self, text: str) -> SentimentResult:
         """Predict sentiment for a single text"""
         try:
-            result = inference_service.analyze_sentiment(text)
+            result = get_inference_service().analyze_sentiment(text)
             return SentimentResult(label=result.label, score=result.score)
         except Exception as e:
             logger.error(f"GraphQL prediction failed: {str(e)}")
@@ -39,7 +39,7 @@ class Query:
     def batch_predict(self, texts: List[str]) -> List[SentimentResult]:
         """Predict sentiment for multiple texts"""
         try:
-            results = inference_service.analyze_batch(texts)
+            results = get_inference_service().analyze_batch(texts)
             return [SentimentResult(label=r.label, score=r.score) for r in results]
         except Exception as e:
             logger.error(f"GraphQL batch prediction failed: {str(e)}")
@@ -49,7 +49,7 @@ class Query:
     def model_info(self) -> ModelInfo:
         """Get model information"""
         try:
-            info = inference_service.get_model_info()
+            info = get_inference_service().get_model_info()
             return ModelInfo(
                 name=info.name,
                 framework=info.framework,
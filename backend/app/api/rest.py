@@ -18,7 +18,7 @@ from ..core.models import (
     ModelInfo,
     HealthStatus
 )
-from ..services.inference import inference_service
+from ..services.inference import get_inference_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -28,7 +28,7 @@ async def predict_sentiment(request: SentimentRequest):
     """Analyze sentiment of a single text"""
     try:
         logger.info(f"Analyzing text: {request.text[:50]}...")
-        result = inference_service.analyze_sentiment(request.text)
+        result = get_inference_service().analyze_sentiment(request.text)
         logger.info(f"Analysis result: {result.label} ({result.score})")
         return result
     except Exception as e:
@@ -44,7 +44,7 @@ async def predict_batch_sentiment(request: BatchSentimentRequest):
         import time
         start_time = time.time()
         
-        results = inference_service.analyze_batch(request.texts)
+        results = get_inference_service().analyze_batch(request.texts)
         
         total_time = time.time() - start_time
         avg_time = total_time / len(results) if results else 0
@@ -64,7 +64,7 @@ async def predict_batch_sentiment(request: BatchSentimentRequest):
 async def get_model_info():
     """Get model information"""
     try:
-        return inference_service.get_model_info()
+        return get_inference_service().get_model_info()
     except Exception as e:
         logger.error(f"Failed to get model info: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -73,7 +73,7 @@ async def get_model_info():
 async def health_check():
     """Health check endpoint"""
     try:
-        return inference_service.get_health_status()
+        return get_inference_service().get_health_status()
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Service unhealthy")
@@ -18,6 +18,7 @@ class Settings(BaseSettings):
     MODEL_NAME: str = Field(default="cardiffnlp/twitter-roberta-base-sentiment-latest", description="HuggingFace model name")
     FALLBACK_MODEL: str = "distilbert-base-uncased-finetuned-sst-2-english"
     DEVICE: str = Field(default="auto", description="Device to use (auto, cpu, cuda)")
+    BACKEND: str = Field(default="torch", description="Inference backend (torch or onnx)")
     QUANTIZED: bool = Field(default=False, description="Whether to use quantized model")
     CACHE_DIR: str = Field(default="./model_cache", description="Model cache directory")
     MODEL_VERSION: str = Field(default="1.0.0", description="Model version")
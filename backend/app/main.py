@@ -8,11 +8,7 @@ import uvicorn
 from typing import List, Optional
 import logging
 import time
-import pandas as pd
-import io
 import os
-import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer, Trainer, TrainingArguments
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -93,7 +89,6 @@ async def startup_event():
         sentiment_pipeline = pipeline(
             "sentiment-analysis",
             model=MODEL_NAME,
-            return_all_scores=True,
             device=-1
         )
         logger.info("Model loaded successfully!")
@@ -105,7 +100,6 @@ async def startup_event():
             sentiment_pipeline = pipeline(
                 "sentiment-analysis",
                 model="distilbert-base-uncased-finetuned-sst-2-english",
-                return_all_scores=True,
                 device=-1
             )
             logger.info("Fallback model loaded successfully!")
@@ -160,8 +154,7 @@ async def predict_sentiment(input_data: TextInput):
     try:
         start_time = time.time()
         
-        results = sentiment_pipeline(input_data.text)
-        best_result = max(results[0], key=lambda x: x['score'])
+        best_result = sentiment_pipeline(input_data.text, top_k=1)[0]
         
         normalized_label = normalize_label(best_result['label'])
         processing_time = time.time() - start_time
@@ -191,8 +184,7 @@ async def predict_batch_sentiment(input_data: BatchTextInput):
         
         for text in input_data.texts:
             text_start_time = time.time()
-            predictions = sentiment_pipeline(text)
-            best_result = max(predictions[0], key=lambda x: x['score'])
+            best_result = sentiment_pipeline(text, top_k=1)[0]
             text_processing_time = time.time() - text_start_time
             
             normalized_label = normalize_label(best_result['label'])
@@ -243,8 +235,7 @@ async def analyze_file(file: UploadFile = File(...)):
         # Analyze each text and collect data for training
         for text in texts:
             text_start_time = time.time()
-            predictions = sentiment_pipeline(text)
-            best_result = max(predictions[0], key=lambda x: x['score'])
+            best_result = sentiment_pipeline(text, top_k=1)[0]
             text_processing_time = time.time() - text_start_time
             
             normalized_label = normalize_label(best_result['label'])
@@ -4,10 +4,13 @@ Inference Service for Batch Processing and Optimization
 
 import asyncio
 import logging
+import os
+import threading
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from collections import deque
 import time
+import numpy as np
 import torch
 from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
 import psutil
@@ -28,7 +31,12 @@ class InferenceRequest:
 
 class SentimentInferenceService:
     """Service for handling sentiment analysis inference"""
-    
+
+    # (batch_size, seq_len) buckets pre-captured as CUDA graphs; batches are
+    # padded up to the nearest bucket and replayed without per-kernel launch
+    # overhead
+    CUDA_GRAPH_SHAPES = [(8, 64), (16, 64), (32, 128)]
+
     def __init__(self):
         self.pipeline: Optional[pipeline] = None
         self.model = None
@@ -37,13 +45,14 @@ class SentimentInferenceService:
         self.model_name = settings.MODEL_NAME
         self._model_loaded = False
         self.start_time = time.time()
-        self.load_model()
         self.request_queue = deque()
         self.processing_task: Optional[asyncio.Task] = None
         self.is_running = False
         self._lock = asyncio.Lock()
         self.total_predictions = 0
         self.total_processing_time = 0
+        self._cuda_graphs: Dict[tuple, tuple] = {}
+        self.backend = "torch"
         
         # Label mapping for Cardiff model
         self.label_mapping = {
@@ -56,13 +65,19 @@ class SentimentInferenceService:
         """Load the sentiment analysis model"""
         try:
             logger.info(f"Loading model: {self.model_name}")
-            
-            # Load the pipeline
+
+            # Optional ONNX Runtime backend with INT8 dynamic quantization
+            if getattr(settings, "BACKEND", "torch") == "onnx" and self._load_onnx_model():
+                self._model_loaded = True
+                return True
+
+            # Load the pipeline; top_k is passed per call — a construction
+            # time top_k leaves __call__ in legacy mode in transformers
+            # 4.35, which double-wraps single-text results
             self.pipeline = pipeline(
                 "sentiment-analysis",
                 model=self.model_name,
-                device=0 if self.device == "cuda" and torch.cuda.is_available() else -1,
-                return_all_scores=True
+                device=0 if self.device == "cuda" and torch.cuda.is_available() else -1
             )
             
             # Load model and tokenizer separately for more control
@@ -71,6 +86,7 @@ class SentimentInferenceService:
             
             logger.info("Model loaded successfully")
             self._model_loaded = True
+            self._capture_cuda_graphs()
             return True
             
         except Exception as e:
@@ -78,6 +94,143 @@ class SentimentInferenceService:
             self._model_loaded = False
             return False
     
+    def _load_onnx_model(self) -> bool:
+        """Export the model to ONNX Runtime with INT8 dynamic quantization"""
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        except ImportError:
+            logger.warning("optimum[onnxruntime] not installed, falling back to PyTorch backend")
+            return False
+
+        try:
+            export_dir = os.path.join(settings.CACHE_DIR, "onnx_int8")
+
+            if not os.path.exists(os.path.join(export_dir, "config.json")):
+                ort_model = ORTModelForSequenceClassification.from_pretrained(
+                    self.model_name, export=True
+                )
+                quantizer = ORTQuantizer.from_pretrained(ort_model)
+                quantizer.quantize(
+                    save_dir=export_dir,
+                    quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False)
+                )
+
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.model = ORTModelForSequenceClassification.from_pretrained(export_dir)
+            self.pipeline = pipeline(
+                "sentiment-analysis",
+                model=self.model,
+                tokenizer=self.tokenizer
+            )
+            self.backend = "onnx"
+
+            logger.info("ONNX Runtime INT8 model loaded successfully")
+            return True
+
+        except Exception as e:
+            logger.warning(f"ONNX export/quantization failed, falling back to PyTorch: {e}")
+            return False
+
+    def _capture_cuda_graphs(self):
+        """Capture fixed-shape CUDA graphs for the classifier forward pass"""
+        if not (self.backend == "torch" and self.device == "cuda" and torch.cuda.is_available()):
+            return
+
+        try:
+            self.model.to("cuda").eval()
+
+            for batch_size, seq_len in self.CUDA_GRAPH_SHAPES:
+                static_ids = torch.zeros((batch_size, seq_len), dtype=torch.long, device="cuda")
+                static_mask = torch.zeros_like(static_ids)
+
+                # Warm up on a side stream before capture
+                stream = torch.cuda.Stream()
+                stream.wait_stream(torch.cuda.current_stream())
+                with torch.cuda.stream(stream), torch.no_grad():
+                    for _ in range(3):
+                        self.model(input_ids=static_ids, attention_mask=static_mask)
+                torch.cuda.current_stream().wait_stream(stream)
+
+                graph = torch.cuda.CUDAGraph()
+                with torch.no_grad(), torch.cuda.graph(graph):
+                    static_out = self.model(input_ids=static_ids, attention_mask=static_mask)
+
+                self._cuda_graphs[(batch_size, seq_len)] = (graph, static_ids, static_mask, static_out.logits)
+
+            logger.info(f"Captured CUDA graphs for shapes: {list(self._cuda_graphs)}")
+
+        except Exception as e:
+            logger.warning(f"CUDA graph capture failed, falling back to eager: {e}")
+            self._cuda_graphs = {}
+
+    def _pick_graph_shape(self, num_texts: int, seq_len: int) -> Optional[tuple]:
+        """Find the smallest captured shape a batch fits into"""
+        for batch_size, max_len in self.CUDA_GRAPH_SHAPES:
+            if ((batch_size, max_len) in self._cuda_graphs and
+                    num_texts <= batch_size and seq_len <= max_len):
+                return (batch_size, max_len)
+        return None
+
+    def _analyze_batch_cuda_graph(self, texts: List[str]) -> Optional[BatchPredictResponse]:
+        """Run a batch through a pre-captured CUDA graph
+
+        Returns None when the batch does not fit any captured shape so the
+        caller can fall back to the eager pipeline.
+        """
+        if not self._cuda_graphs:
+            return None
+
+        start_time = time.time()
+
+        encoding = self.tokenizer(
+            texts,
+            truncation=True,
+            padding=True,
+            max_length=max(l for _, l in self.CUDA_GRAPH_SHAPES),
+            return_tensors="pt"
+        )
+        num_texts, seq_len = encoding["input_ids"].shape
+
+        shape = self._pick_graph_shape(num_texts, seq_len)
+        if shape is None:
+            return None
+
+        # Pad into the static buffers and replay the captured graph
+        graph, static_ids, static_mask, static_logits = self._cuda_graphs[shape]
+        static_ids.zero_()
+        static_mask.zero_()
+        static_ids[:num_texts, :seq_len].copy_(encoding["input_ids"], non_blocking=True)
+        static_mask[:num_texts, :seq_len].copy_(encoding["attention_mask"], non_blocking=True)
+        graph.replay()
+
+        probs = torch.softmax(static_logits[:num_texts].float(), dim=-1).cpu()
+
+        id2label = self.model.config.id2label
+        total_time = time.time() - start_time
+        per_text_time = total_time / num_texts
+
+        results = []
+        for i, text in enumerate(texts):
+            best_idx = int(probs[i].argmax())
+            best_score = float(probs[i, best_idx])
+            results.append(PredictResponse(
+                text=text,
+                sentiment=SentimentLabel(
+                    label=self.normalize_label(id2label[best_idx]),
+                    score=best_score
+                ),
+                confidence=best_score,
+                processing_time=per_text_time,
+                scores={id2label[j]: float(probs[i, j]) for j in range(probs.shape[1])}
+            ))
+
+        return BatchPredictResponse(
+            results=results,
+            total_processing_time=total_time,
+            average_processing_time=per_text_time
+        )
+
     def is_model_loaded(self) -> bool:
         """Check if model is loaded"""
         return self._model_loaded and self.pipeline is not None
@@ -86,23 +239,26 @@ class SentimentInferenceService:
         """Normalize label names"""
         return self.label_mapping.get(label, label.lower())
     
-    def analyze_sentiment(self, text: str) -> PredictResponse:
+    def analyze_sentiment(self, text: str, include_scores: bool = False) -> PredictResponse:
         """Analyze sentiment of a single text"""
         if not self.is_model_loaded():
             raise RuntimeError("Model not loaded")
-        
+
         start_time = time.time()
-        
+
         try:
-            # Get predictions
-            results = self.pipeline(text)
-            
-            # Find the highest scoring result
-            best_result = max(results[0], key=lambda x: x['score'])
-            
+            # Get predictions; all-class scores only when the caller asks
+            if include_scores:
+                results = self.pipeline(text, top_k=None)
+                best_result = max(results, key=lambda x: x['score'])
+                scores = {result['label']: result['score'] for result in results}
+            else:
+                best_result = self.pipeline(text, top_k=1)[0]
+                scores = None
+
             normalized_label = self.normalize_label(best_result['label'])
             processing_time = time.time() - start_time
-            
+
             return PredictResponse(
                 text=text,
                 sentiment=SentimentLabel(
@@ -111,7 +267,7 @@ class SentimentInferenceService:
                 ),
                 confidence=best_result['score'],
                 processing_time=processing_time,
-                scores={result['label']: result['score'] for result in results[0]}
+                scores=scores
             )
             
         except Exception as e:
@@ -159,9 +315,9 @@ class SentimentInferenceService:
         
         return ModelInfoResponse(
             name=self.model_name,
-            framework="PyTorch/Transformers",
+            framework="ONNX Runtime" if self.backend == "onnx" else "PyTorch/Transformers",
             device=device_info,
-            quantized=False,
+            quantized=self.backend == "onnx",
             version="1.0.0"
         )
     
@@ -185,6 +341,10 @@ class SentimentInferenceService:
     
     async def start(self):
         """Start the inference service"""
+        if not self._model_loaded:
+            # Offload the HF download/load so the event loop stays responsive
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.load_model)
         self.is_running = True
         self.processing_task = asyncio.create_task(self._process_requests())
         logger.info("Inference service started")
@@ -283,28 +443,22 @@ class SentimentInferenceService:
             return
         
         try:
-            # Flatten all texts from all requests
+            # Flatten all texts and precompute per-request result offsets
             all_texts = []
-            request_text_counts = []
-            
             for request in batch:
                 all_texts.extend(request.texts)
-                request_text_counts.append(len(request.texts))
-            
-            # Run inference on all texts
-            results = self.analyze_batch(all_texts)
-            
-            # Distribute results back to requests
-            result_index = 0
-            for i, request in enumerate(batch):
-                text_count = request_text_counts[i]
-                request_results = results.results[result_index:result_index + text_count]
-                result_index += text_count
-                
-                # Set result for this request
+            offsets = np.cumsum([0] + [len(request.texts) for request in batch])
+
+            # Run inference on all texts, preferring the captured CUDA graph
+            results = self._analyze_batch_cuda_graph(all_texts)
+            if results is None:
+                results = self.analyze_batch(all_texts)
+
+            # Distribute result slices back to requests
+            for request, start, end in zip(batch, offsets[:-1], offsets[1:]):
                 if not request.future.done():
-                    request.future.set_result(request_results)
-            
+                    request.future.set_result(results.results[start:end])
+
             logger.debug(f"Processed batch of {len(batch)} requests with {len(all_texts)} texts")
             
         except Exception as e:
@@ -315,5 +469,18 @@ class SentimentInferenceService:
                 if not request.future.done():
                     request.future.set_exception(e)
 
-# Global inference service instance
-inference_service = SentimentInferenceService()
+# Shared inference service instance, constructed lazily so importing this
+# module (or forking uvicorn workers) does not pay the model-load cost
+_inference_service: Optional[SentimentInferenceService] = None
+_service_lock = threading.Lock()
+
+def get_inference_service() -> SentimentInferenceService:
+    """Return the shared inference service, constructing it on first use"""
+    global _inference_service
+    if _inference_service is None:
+        with _service_lock:
+            if _inference_service is None:
+                service = SentimentInferenceService()
+                service.load_model()
+                _inference_service = service
+    return _inference_service
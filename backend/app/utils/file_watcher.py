@@ -1,7 +1,7 @@
 import asyncio
 import os
 from pathlib import Path
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, Optional
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import logging
@@ -16,14 +16,21 @@ class FileWatcher:
         self.watch_directory.mkdir(exist_ok=True)
         self.observer = Observer()
         self.callbacks: Dict[str, Callable] = {}
-        
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
     def add_callback(self, event_type: str, callback: Callable):
         """Add callback for file events"""
         self.callbacks[event_type] = callback
-        
+
     def start_watching(self):
-        """Start watching for file changes"""
-        event_handler = FileEventHandler(self.callbacks)
+        """Start watching for file changes
+
+        Must be called from a running event loop: watchdog events fire on
+        the observer thread, so the handler needs this loop to schedule
+        callbacks safely via run_coroutine_threadsafe.
+        """
+        self.loop = asyncio.get_running_loop()
+        event_handler = FileEventHandler(self.callbacks, self.loop)
         self.observer.schedule(event_handler, str(self.watch_directory), recursive=True)
         self.observer.start()
         logger.info(f"Started watching directory: {self.watch_directory}")
@@ -35,17 +42,40 @@ class FileWatcher:
         logger.info("Stopped file watching")
 
 class FileEventHandler(FileSystemEventHandler):
-    def __init__(self, callbacks: Dict[str, Callable]):
+    # Editors and git checkouts emit bursts of events per file; wait for the
+    # burst to settle so each logical change triggers a single callback
+    SETTLE_SECONDS = 0.5
+
+    def __init__(self, callbacks: Dict[str, Callable], loop: asyncio.AbstractEventLoop):
         self.callbacks = callbacks
-        
+        self.loop = loop
+        self._pending: Dict[tuple, asyncio.TimerHandle] = {}
+
+    def _schedule(self, event_type: str, path: str):
+        """Coalesce bursts of events into one callback per (type, path)"""
+        callback = self.callbacks.get(event_type)
+        if callback:
+            self.loop.call_soon_threadsafe(self._debounce, event_type, path, callback)
+
+    def _debounce(self, event_type: str, path: str, callback: Callable):
+        # Runs on the event loop: cancel any pending timer for this file and
+        # restart the settle window, so only the last event in a burst fires
+        key = (event_type, path)
+        pending = self._pending.pop(key, None)
+        if pending:
+            pending.cancel()
+        self._pending[key] = self.loop.call_later(
+            self.SETTLE_SECONDS, self._fire, key, path, callback
+        )
+
+    def _fire(self, key: tuple, path: str, callback: Callable):
+        self._pending.pop(key, None)
+        asyncio.ensure_future(callback(path))
+
     def on_created(self, event):
         if not event.is_directory:
-            callback = self.callbacks.get("created")
-            if callback:
-                asyncio.create_task(callback(event.src_path))
-                
+            self._schedule("created", event.src_path)
+
     def on_modified(self, event):
         if not event.is_directory:
-            callback = self.callbacks.get("modified")
-            if callback:
-                asyncio.create_task(callback(event.src_path))
+            self._schedule("modified", event.src_path)